@@ -16,6 +16,7 @@
 import os
 import re
 import shutil
+import time
 from pathlib import Path
 from typing import Generator
 
@@ -128,15 +129,15 @@ def _process_action_step(step_log: ActionStep, skip_model_outputs: bool = False)
         yield parent_message_tool
 
     # Display execution logs if they exist
-    if getattr(step_log, "observations", "") and step_log.observations.strip():
-        log_content = step_log.observations.strip()
-        if log_content:
-            log_content = re.sub(r"^Execution logs:\s*", "", log_content)
-            yield gr.ChatMessage(
-                role=MessageRole.ASSISTANT,
-                content=f"```bash\n{log_content}\n",
-                metadata={"title": "📝 Execution Logs", "status": "done"},
-            )
+    # Tool observations can be large JSON payloads, so only walk them once
+    log_content = (getattr(step_log, "observations", "") or "").strip()
+    if log_content:
+        log_content = re.sub(r"^Execution logs:\s*", "", log_content)
+        yield gr.ChatMessage(
+            role=MessageRole.ASSISTANT,
+            content=f"```bash\n{log_content}\n",
+            metadata={"title": "📝 Execution Logs", "status": "done"},
+        )
 
     # Display any images in observations
     if getattr(step_log, "observations_images", []):
@@ -251,18 +252,29 @@ def stream_to_gradio(
     task_images: list | None = None,
     reset_agent_memory: bool = False,
     additional_args: dict | None = None,
+    min_update_interval: float = 0.05,
 ) -> Generator:
-    """Runs an agent with the given task and streams the messages from the agent as gradio ChatMessages."""
+    """Runs an agent with the given task and streams the messages from the agent as gradio ChatMessages.
+
+    Streamed completion deltas are coalesced so the chat is re-rendered at most once every
+    `min_update_interval` seconds, instead of once per token.
+    """
 
     if not _is_package_available("gradio"):
         raise ModuleNotFoundError(
             "Please install 'gradio' extra to use the GradioUI: `pip install 'smolagents[gradio]'`"
         )
     accumulated_events: list[ChatMessageStreamDelta] = []
+    # Number of accumulated deltas already sent to the UI
+    rendered_events = 0
+    last_update = 0.0
     for event in agent.run(
         task, images=task_images, stream=True, reset=reset_agent_memory, additional_args=additional_args
     ):
         if isinstance(event, ActionStep | PlanningStep | FinalAnswerStep):
+            # Flush deltas held back by the throttle so the streamed message is complete
+            if len(accumulated_events) > rendered_events:
+                yield agglomerate_stream_deltas(accumulated_events).render_as_markdown()
             for message in pull_messages_from_step(
                 event,
                 # If we're streaming model outputs, no need to display them twice
@@ -270,10 +282,17 @@ def stream_to_gradio(
             ):
                 yield message
             accumulated_events = []
+            rendered_events = 0
         elif isinstance(event, ChatMessageStreamDelta):
             accumulated_events.append(event)
-            text = agglomerate_stream_deltas(accumulated_events).render_as_markdown()
-            yield text
+            now = time.monotonic()
+            if now - last_update >= min_update_interval:
+                last_update = now
+                rendered_events = len(accumulated_events)
+                text = agglomerate_stream_deltas(accumulated_events).render_as_markdown()
+                yield text
+    if len(accumulated_events) > rendered_events:
+        yield agglomerate_stream_deltas(accumulated_events).render_as_markdown()
 
 
 class GradioUI:
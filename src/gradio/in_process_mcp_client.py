@@ -0,0 +1,78 @@
+import asyncio
+import importlib.util
+import sys
+import threading
+from functools import partial
+from pathlib import Path
+
+from fastmcp import Client, FastMCP
+from mcpadapt.smolagents_adapter import SmolAgentsAdapter
+from smolagents import Tool
+
+
+def load_mcp_server(server_path: str) -> FastMCP:
+    """Import the MCP server script and return its FastMCP instance (the module-level `mcp`)"""
+    path = Path(server_path).resolve()
+    # The server imports its sibling modules (e.g. utils) by name; put its directory first so an installed module of
+    # the same name cannot shadow them
+    if sys.path[:1] != [str(path.parent)]:
+        sys.path.insert(0, str(path.parent))
+    spec = importlib.util.spec_from_file_location(path.stem, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[path.stem] = module
+    spec.loader.exec_module(module)
+    return module.mcp
+
+
+class InProcessMCPClient:
+    """
+    Make the tools of a FastMCP server running in this process available to smolagents.
+
+    Drop-in replacement for smolagents' `MCPClient` (same `get_tools()` / `disconnect()` interface) that
+    talks to the server over FastMCP's in-memory transport, so no server subprocess is spawned and
+    tool calls skip the stdio JSON-RPC framing.
+
+    smolagents tools are synchronous, so the FastMCP client lives on an event loop in a background
+    thread and each tool call is run there.
+
+    Args:
+        server (FastMCP): The FastMCP server instance
+        structured_output (bool): Whether to enable structured output, as in `MCPClient` (default False)
+    """
+
+    def __init__(self, server: FastMCP, structured_output: bool = False):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        self._client = Client(server)
+        self._adapter = SmolAgentsAdapter(structured_output=structured_output)
+        self._tools: list[Tool] | None = None
+        self.connect()
+
+    def _run(self, coro):
+        """Run a coroutine on the client's event loop and wait for its result"""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def _call_tool(self, name: str, arguments: dict | None):
+        return self._run(self._client.call_tool_mcp(name, arguments or {}))
+
+    def connect(self):
+        """Connect to the MCP server and initialize the tools."""
+        self._run(self._client.__aenter__())
+        self._tools = [
+            self._adapter.adapt(partial(self._call_tool, tool.name), tool)
+            for tool in self._run(self._client.list_tools())
+        ]
+
+    def disconnect(self):
+        """Disconnect from the MCP server and stop the background event loop."""
+        self._run(self._client.__aexit__(None, None, None))
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def get_tools(self) -> list[Tool]:
+        """The smolagents tools available from the MCP server."""
+        if self._tools is None:
+            raise ValueError("Couldn't retrieve tools from MCP server, run `connect()` first before accessing tools")
+        return self._tools
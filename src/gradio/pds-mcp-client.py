@@ -1,8 +1,8 @@
 import os
 from dotenv import load_dotenv
-from mcp import StdioServerParameters
-from smolagents import ToolCallingAgent, MCPClient, OpenAIServerModel
+from smolagents import ToolCallingAgent, OpenAIServerModel
 from gradio_smolagents_ui import GradioUI
+from in_process_mcp_client import InProcessMCPClient, load_mcp_server
 
 # Load environment variables from .env file
 # Requires OPENAI_API_KEY to be set in environment or .env file
@@ -12,12 +12,8 @@ load_dotenv()
 if not os.getenv("OPENAI_API_KEY"):
     raise ValueError("OPENAI_API_KEY environment variable is required but not set")
 
-mcp_client = MCPClient(server_parameters=StdioServerParameters(
-        command=os.getenv("PYTHON_PATH"),
-        args=[
-          os.getenv("MCP_SERVER_PATH")
-      ],
-))
+# Run the PDS MCP server in this process instead of spawning it as a stdio subprocess
+mcp_client = InProcessMCPClient(load_mcp_server(os.getenv("MCP_SERVER_PATH")))
 
 tools = mcp_client.get_tools()
 model = OpenAIServerModel(
@@ -28,20 +24,11 @@ model = OpenAIServerModel(
 
 agent = ToolCallingAgent(tools=[*tools], model=model, max_steps=3, stream_outputs=True)
 
-agent.prompt_templates["final_answer"]["post_messages"] = agent.prompt_templates["final_answer"]["post_messages"] + """
-First, identify relevant context products using search_investigations (missions), search_targets (celestial bodies), search_instruments (scientific instruments),
-or search_instrument_hosts (spacecraft/platforms) based on the user's query. Second, use the URNs from these context products to call search_collections
-with appropriate filters to find actual data collections. Use get_product for detailed information about specific products when needed.
-"""
-
+# The agent only receives the adapted tools (not the server instructions or resources), so the PDS
+# workflow reaches it through the tool descriptions plus the one-line hint below
 agent.prompt_templates["system_prompt"] = agent.prompt_templates["system_prompt"] + """
 
-# Info. on interacting with the PDS MCP server
-
-This MCP server provides access to NASA's Planetary Data System (PDS) Registry API. The NASA PDS is a collection of XML files following
-the PDS4 standard and are organized into three hierarchical levels: bundles, collections, and observationals, in that order.
-Observationals are the "labels" or metadata for actual NASA data. Every PDS4 file is associated by a unique URN identifier
-(ex. urn:nasa:pds:context:investigation:mission.juno is the URN for the Juno Mission).
+To find PDS data, first call search_all_context to find context product URNs, then pass those URNs to search_collections.
 
 Present all search results with clear titles, descriptions, and displayed URN identifiers.
 Organize results with section headers and include key metadata (missions, targets, instruments, dates, access URLs).
@@ -1,21 +1,169 @@
+import asyncio
+import functools
 import httpx
-import requests
+import logging
+import orjson
+from async_lru import alru_cache
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
 from fastmcp import FastMCP
-from typing import Union
-import json
+from urllib.parse import quote
 
-from utils import build_search_url, SearchParams, clean_urn
+from utils import build_search_url, _build_search_url, SearchParams, clean_urn
+
+# Log through logging (stderr) rather than print: with the stdio transport, stdout carries the MCP protocol
+logger = logging.getLogger(__name__)
+
+_client: httpx.AsyncClient | None = None
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Return the HTTP client shared across tool calls, so repeated requests to the registry reuse pooled connections.
+
+    The client is created on first use, and again if a previous server session closed it (FastMCP runs the
+    lifespan for every in-memory client session, as used by the Gradio app).
+    Tools request paths relative to the API root (e.g. "/products").
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            base_url="https://pds.mcp.nasa.gov/api/search/1",
+            # The transport owns the connection pool, so HTTP/2 and the pool limits are set on it rather than the client.
+            # Its retries re-attempt failed connections (refused, reset, DNS) before a tool call gives up.
+            transport=httpx.AsyncHTTPTransport(
+                http2=True,
+                retries=3,
+                limits=httpx.Limits(max_keepalive_connections=32, max_connections=64, keepalive_expiry=60),
+            ),
+            # Fail fast when the registry is unreachable rather than holding a tool call for the full read timeout
+            timeout=httpx.Timeout(30.0, connect=5.0),
+        )
+    return _client
+
+@asynccontextmanager
+async def lifespan(server: FastMCP):
+    """Close the shared HTTP client when the server shuts down"""
+    try:
+        yield {}
+    finally:
+        if _client is not None:
+            await _client.aclose()
+
+# Accept headers for the registry's flat key-value and full JSON representations; tuples so they can be part of a
+# cache key
+_KVP_HEADERS = (("Accept", "application/kvp+json"),)
+_JSON_HEADERS = (("Accept", "application/json"),)
+
+# Registry responses worth retrying: rate limiting and transient gateway errors
+_RETRY_STATUSES = frozenset((429, 502, 503, 504))
+_MAX_ATTEMPTS = 3
+# Upper bound on a server-requested Retry-After wait, so a tool call is not held for minutes
+_MAX_RETRY_AFTER = 5.0
+# Caps requests in flight to the registry across all tool calls, so concurrent tools and crawls cannot flood it
+_registry_semaphore = asyncio.Semaphore(32)
+
+async def _get_with_backoff(url: str, headers: tuple[tuple[str, str], ...]) -> httpx.Response:
+    """GET a registry URL, retrying rate-limited and gateway error responses with exponential backoff"""
+    for attempt in range(_MAX_ATTEMPTS):
+        # Held only for the request itself, not while backing off
+        async with _registry_semaphore:
+            response = await get_http_client().get(url, headers=headers)
+        if response.status_code not in _RETRY_STATUSES or attempt == _MAX_ATTEMPTS - 1:
+            return response
+        delay = 2 ** attempt * 0.1
+        retry_after = response.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            delay = min(float(retry_after), _MAX_RETRY_AFTER)
+        logger.info("Registry returned %s for %s, retrying in %.1fs", response.status_code, url, delay)
+        await asyncio.sleep(delay)
+
+@alru_cache(maxsize=512, ttl=300)
+async def _fetch(api_url: str, headers: tuple[tuple[str, str], ...]) -> bytes:
+    """GET a registry search URL and return the raw body, cached for 5 minutes so repeated searches skip the registry"""
+    response = await _get_with_backoff(api_url, headers)
+    response.raise_for_status()
+    return response.content
+
+@alru_cache(maxsize=1024, ttl=3600)
+async def _fetch_product(urn: str) -> bytes:
+    """
+    GET a single product by its URN and return the raw JSON body, cached for an hour.
+
+    Given a version-less URN the registry returns the latest version, and requests for any version of a context
+    product (which almost never change) share one entry. Given a lidvid, exactly that version is returned.
+    """
+    # Not routed through _fetch, so the body is held by this longer-lived cache only
+    response = await _get_with_backoff(f"/products/{urn}", _JSON_HEADERS)
+    response.raise_for_status()
+    return response.content
+
+def _load_data(content: bytes) -> list:
+    """Parse the 'data' array of a registry search response"""
+    # The tools request only the fields they need, so 'data' is most of the body and a full orjson parse is fastest
+    return orjson.loads(content)['data']
+
+def _load_keys(content: bytes, keys: tuple[str, ...]) -> dict:
+    """Parse a JSON object and keep only the given top-level keys"""
+    data = orjson.loads(content)
+    return {k: data[k] for k in keys if k in data}
 
 mcp = FastMCP("Planetary Data System MCP Server", """
 This MCP server provides access to NASA's Planetary Data System (PDS) Registry API. The NASA PDS is a collection of XML files following
 the PDS4 standard and are organized into three hierarchical levels: bundles, collections, and observationals, in that order. 
 Observationals are the "labels" or metadata for actual NASA data. Every PDS4 file is associated by a unique URN identifier 
 (ex. urn:nasa:pds:context:investigation:mission.juno is the URN for the Juno Mission).
-""")
+""", lifespan=lifespan)
+
+# Quotes and parentheses in user-supplied keywords, types and lids would terminate or unbalance the registry query, so they are dropped
+_SANITIZE = str.maketrans({'"': "", "'": "", "(": "", ")": ""})
+
+@dataclass(frozen=True, slots=True)
+class _ContextKind:
+    """The parts of a context product search that differ between investigations, targets, hosts and instruments"""
+    prefix: str
+    fields: tuple[str, ...]
+    description_field: str
+    type_field: str | None = None
 
-@mcp.tool()
+# The search URL builders are memoized since agents often repeat the same search
+@functools.lru_cache(maxsize=256)
+def _build_context_url(kind: _ContextKind, keywords: str | tuple[str, ...] | None, type_value: str | None, limit: int) -> str:
+    """Build a context product search API URL"""
+    base_url = "/products"
+
+    parts = [kind.prefix]
+
+    if isinstance(keywords, str):
+        keywords = (keywords,)
+    # Runs of whitespace are collapsed, so e.g. "mars  rover " and "mars rover" build the same query
+    keywords = [k for k in (" ".join(k.translate(_SANITIZE).split()) for k in keywords or ()) if k]
+
+    if keywords:
+        # Several keywords are OR-ed together in one query rather than one search per keyword
+        parts.append("(" + " or ".join(f'(title like "{k}") or ({kind.description_field} like "{k}")' for k in keywords) + ")")
+
+    if type_value:
+        parts.append(f'(({kind.type_field} like "{type_value.translate(_SANITIZE)}"))')
+
+    q_str = "(" + " and ".join(parts) + ")" if len(parts) > 1 else kind.prefix
+
+    return build_search_url(base_url, SearchParams(
+        query=q_str,
+        fields=kind.fields,
+        limit=limit
+    ))
+
+_INVESTIGATION = _ContextKind(
+    prefix='(product_class eq "Product_Context" and lid like "urn:nasa:pds:context:investigation:*")',
+    fields=("title", "lid", "pds:Investigation.pds:stop_date", "pds:Investigation.pds:start_date", "pds:Investigation.pds:type", "ops:Label_File_Info.ops:file_ref"),
+    description_field="description",
+)
+
+# Tools already return JSON text; output_schema=None keeps FastMCP from sending each result a second time
+# as structured content
+@mcp.tool(output_schema=None)
 async def search_investigations(
-    keywords: str | None = "",
+    keywords: str | list[str] | None = "",
     limit: int = 10
 ) -> str:
     """
@@ -27,96 +175,123 @@ async def search_investigations(
     Use for queries about space missions, mission timelines, or finding missions that studied specific targets.
     
     Args:
-        keywords (str): Space-delimited search terms (e.g. 'mars rover', 'jupiter cassini')
+        keywords (str | list[str]): Space-delimited search terms (e.g. 'mars rover', 'jupiter cassini'),
+            or a list of terms to match any of (e.g. ['juno', 'galileo'])
         limit (int): Max results (default 10)
     """
 
-    base_url = "https://pds.mcp.nasa.gov/api/search/1/products"
-
     # list investigations
-    headers = {"Accept": "application/kvp+json"}
-
-    q_str = rf'(product_class eq "Product_Context" and lid like "urn:nasa:pds:context:investigation:*")'
-
-    if keywords:
-        keywords_str = " ".join(keywords)
-        keyword_query = f'((title like "{keywords_str}") or (description like "{keywords_str}"))'
-        q_str = f"'({q_str} and {keyword_query})'"
-
-    api_url = build_search_url(base_url, SearchParams(
-        query=q_str,
-        fields=["title", "lid", "pds:Investigation.pds:stop_date", "pds:Investigation.pds:start_date", "pds:Investigation.pds:type", "ops:Label_File_Info.ops:file_ref"],
-        limit=limit,
-        sort="",
-        search_after="",
-        facet_fields='',
-        facet_limit=""
-    ))
+    headers = _KVP_HEADERS
 
+    if isinstance(keywords, list):
+        keywords = tuple(keywords)
+    api_url = _build_context_url(_INVESTIGATION, keywords, None, limit)
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(api_url, headers=headers)
-            response.raise_for_status()
-            return json.dumps(response.json()['data'], indent=2)
+        content = await _fetch(api_url, headers)
+        return orjson.dumps(_load_data(content)).decode()
     except httpx.HTTPStatusError as e:
         return f"HTTP error occurred: {e.response.status_code} - {e.response.text}"
     except Exception as e:
         return f"Error occurred: {str(e)}"
 
+_TARGET_TYPES = (
+    "Planetary Nebula",
+    "Galaxy",
+    "Calibrator",
+    "Trans-Neptunian Object",
+    "Planetary System",
+    "Satellite",
+    "Centaur",
+    "Astrophysical",
+    "Star Cluster",
+    "Laboratory Analog",
+    "Dust",
+    "Asteroid",
+    "Comet",
+    "Equipment",
+    "Star",
+    "Ring",
+    "Dwarf Planet",
+    "Calibration Field",
+    "Planet",
+    "Plasma Cloud",
+    "Plasma Stream",
+    "Magnetic Field",
+)
+
 @mcp.resource("resource://target_type")
 def list_target_types():
     """
     List of types of Targets
     """
-    return [
-        "Planetary Nebula",
-        "Galaxy",
-        "Calibrator",
-        "Trans-Neptunian Object",
-        "Planetary System",
-        "Satellite",
-        "Centaur",
-        "Astrophysical",
-        "Star Cluster",
-        "Laboratory Analog",
-        "Dust",
-        "Asteroid",
-        "Comet",
-        "Equipment",
-        "Star",
-        "Ring",
-        "Dwarf Planet",
-        "Calibration Field",
-        "Planet",
-        "Plasma Cloud",
-        "Plasma Stream",
-        "Magnetic Field"
-    ]
+    return _TARGET_TYPES
+
 
+_INSTRUMENT_HOST_TYPES = ("Rover", "Lander", "Spacecraft")
 
 @mcp.resource("resource://instrument_host_type")
 def list_instrument_hosts():
     """
     List of types of Instrument Hosts
     """
-    return ["Rover", "Lander", "Spacecraft"]
+    return _INSTRUMENT_HOST_TYPES
+
+_INSTRUMENT_TYPES = (
+    "Energetic Particle Detector",
+    "Plasma Analyzer",
+    "Regolith Properties",
+    "Spectrograph",
+    "Imager",
+    "Atmospheric Sciences",
+    "Spectrometer",
+    "Radio-Radar",
+    "Ultraviolet Spectrometer",
+    "Small Bodies Sciences",
+    "Dust",
+    "Particle Detector",
+    "Photometer",
+    "Polarimeter",
+    "Plasma Wave Spectrometer",
+)
 
 @mcp.resource("resource://instrument_type")
 def list_instruments():
     """
     List of types of Instruments
     """
-    return ["Energetic Particle Detector", "Plasma Analyzer", "Regolith Properties", "Spectrograph", "Imager", "Atmospheric Sciences", "Spectrometer", "Radio-Radar", "Ultraviolet Spectrometer", "Small Bodies Sciences", "Dust", "Particle Detector", "Photometer", "Polarimeter", "Plasma Wave Spectrometer"]
+    return _INSTRUMENT_TYPES
+
+_INVESTIGATION_TYPES = ("Field Campaign", "Other Investigation", "Individual Investigation", "Mission", "Observing Campaign")
 
 @mcp.resource("resource://investigation_type")
 def list_investigation_type():
     """
     List of types of Investigations
     """
-    return ["Field Campaign", "Other Investigation", "Individual Investigation", "Mission", "Observing Campaign"]
+    return _INVESTIGATION_TYPES
 
-@mcp.tool()
+@mcp.resource("resource://pds_workflow")
+def get_pds_workflow():
+    """
+    Recommended workflow for finding PDS data with these tools
+    """
+    return (
+        "First, identify relevant context products with search_all_context, or with search_investigations (missions), "
+        "search_targets (celestial bodies), search_instruments (scientific instruments) or search_instrument_hosts "
+        "(spacecraft/platforms) when filtering by type. Second, use the URNs from these context products to call "
+        "search_collections with appropriate filters to find actual data collections. Use crawl_context_product to "
+        "discover context products related to a URN, and get_product for detailed information about a specific product."
+    )
+
+_TARGET = _ContextKind(
+    prefix='(product_class eq "Product_Context" and lid like "urn:nasa:pds:context:target:*")',
+    fields=("title", "lid", "pds:Target.pds:type", "pds:Alias.pds:alternate_title"),
+    description_field="pds:Target.pds:description",
+    type_field="pds:Target.pds:type",
+)
+
+@mcp.tool(output_schema=None)
 async def search_targets(
     keywords: str | None = "",
     target_type: str | None  = "",
@@ -136,45 +311,28 @@ async def search_targets(
         limit (int): Max results (default 10)
     """
 
-    base_url = "https://pds.mcp.nasa.gov/api/search/1/products"
-
     # list investigations
-    headers = {"Accept": "application/kvp+json"}
+    headers = _KVP_HEADERS
 
-    q_str = rf'(product_class eq "Product_Context" and lid like "urn:nasa:pds:context:target:*")'
-    
-    if keywords:
-        keyword_query = f'((title like "{keywords}") or (pds:Target.pds:description like "{keywords}"))'
-        q_str = f"'({q_str} and {keyword_query})'"
-    
-    if target_type:
-        q_str = f'({q_str} and ((pds:Target.pds:type like "{target_type}")))'
-
-    api_url = build_search_url(base_url, SearchParams(
-        query=q_str,
-        fields=["title", "lid", "pds:Target.pds:type", "pds:Alias.pds:alternate_title"],
-        limit=limit,
-        sort="",
-        search_after="",
-        facet_fields="",
-        facet_limit=""
-    ))
+    api_url = _build_context_url(_TARGET, keywords, target_type, limit)
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(api_url, headers=headers)
-            response.raise_for_status()
-            response = response.json()
-            # response["API_URL"] = api_url
-            return json.dumps(response, indent=2)
+        # The registry response is returned as-is, so there is no need to parse and re-serialize it
+        return (await _fetch(api_url, headers)).decode()
     except httpx.HTTPStatusError as e:
         return f"HTTP error occurred: {e.response.status_code} - {e.response.text}"
     except Exception as e:
         return f"Error occurred: {str(e)}"
 
 
+_INSTRUMENT_HOST = _ContextKind(
+    prefix='(product_class eq "Product_Context" and lid like "urn:nasa:pds:context:instrument_host:*")',
+    fields=("pds:Instrument_Host.pds:type",),
+    description_field="pds:Instrument_Host.pds:description",
+    type_field="pds:Instrument_Host.pds:type",
+)
 
-@mcp.tool()
+@mcp.tool(output_schema=None)
 async def search_instrument_hosts(
     keywords: str | None = "",
     instrument_host_type: str | None = "",
@@ -194,44 +352,26 @@ async def search_instrument_hosts(
         limit (int): Max results (default 10)
     """
 
-    base_url = "https://pds.mcp.nasa.gov/api/search/1/products"
-
     # list investigations
-    headers = {"Accept": "application/json"}
-
-    q_str = rf'(product_class eq "Product_Context" and lid like "urn:nasa:pds:context:instrument_host:*")'
-    
-    if keywords:
-        keyword_query = f'((title like "{keywords}") or (pds:Instrument_Host.pds:description like "{keywords}"))'
-        q_str = f"'({q_str} and {keyword_query})'"
-    
-    if instrument_host_type:
-        q_str = f'({q_str} and ((pds:Instrument_Host.pds:type like "{instrument_host_type}")))'
+    headers = _JSON_HEADERS
 
-    api_url = build_search_url(base_url, SearchParams(
-        query=q_str,
-        fields=["pds:Instrument_Host.pds:type"],
-        limit=limit,
-        sort="",
-        search_after="",
-        facet_fields="",
-        facet_limit=""
-    ))
+    api_url = _build_context_url(_INSTRUMENT_HOST, keywords, instrument_host_type, limit)
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(api_url, headers=headers)
-            response.raise_for_status()
-            response = response.json()
-            # response["API_URL"] = api_url
-            return json.dumps(response, indent=2)
+        return (await _fetch(api_url, headers)).decode()
     except httpx.HTTPStatusError as e:
         return f"HTTP error occurred: {e.response.status_code} - {e.response.text}"
     except Exception as e:
         return f"Error occurred: {str(e)}"
 
+_INSTRUMENT = _ContextKind(
+    prefix='(product_class eq "Product_Context" and lid like "urn:nasa:pds:context:instrument:*")',
+    fields=("pds:Instrument.pds:type",),
+    description_field="pds:Instrument.pds:description",
+    type_field="pds:Instrument.pds:type",
+)
 
-@mcp.tool()
+@mcp.tool(output_schema=None)
 async def search_instruments(
     keywords: str | None = "",
     instrument_type: str | None = "",
@@ -251,210 +391,308 @@ async def search_instruments(
         limit (int): Max results (default 10)
     """
 
-    base_url = "https://pds.mcp.nasa.gov/api/search/1/products"
-
     # list investigations
-    headers = {"Accept": "application/json"}
+    headers = _JSON_HEADERS
 
-    q_str = r'(product_class eq "Product_Context" and lid like "urn:nasa:pds:context:instrument:*")'
-    
-    if keywords:
-        keyword_query = f'((title like "{keywords}") or (pds:Instrument.pds:description like "{keywords}"))'
-        q_str = f"'({q_str} and {keyword_query})'"
-    
-    if instrument_type:
-        q_str = f'({q_str} and ((pds:Instrument.pds:type like "{instrument_type}")))'
-
-    api_url = build_search_url(base_url, SearchParams(
-        query=q_str,
-        fields=["pds:Instrument.pds:type"],
-        limit=limit,
-        sort="",
-        search_after="",
-        facet_fields="",
-        facet_limit=""
-    ))
+    api_url = _build_context_url(_INSTRUMENT, keywords, instrument_type, limit)
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(api_url, headers=headers)
-            response.raise_for_status()
-            response = response.json()
-            # response["API_URL"] = api_url
-            return json.dumps(response, indent=2)
+        return (await _fetch(api_url, headers)).decode()
     except httpx.HTTPStatusError as e:
         return f"HTTP error occurred: {e.response.status_code} - {e.response.text}"
     except Exception as e:
         return f"Error occurred: {str(e)}"
 
-@mcp.tool()
+@mcp.tool(output_schema=None)
+async def search_all_context(
+    keywords: str | None = "",
+    limit: int = 10
+) -> str:
+    """
+    Search all PDS Context product types (Investigations, Targets, Instruments, Instrument Hosts) at once.
+
+    Runs search_investigations, search_targets, search_instruments and search_instrument_hosts concurrently
+    with the same keywords and returns their results grouped by type.
+
+    Use as the first step for open-ended queries, to find the URNs needed by search_collections.
+
+    Args:
+        keywords (str): Space-delimited search terms (e.g. 'mars rover', 'jupiter cassini')
+        limit (int): Max results per product type (default 10)
+    """
+
+    results = await asyncio.gather(
+        search_investigations(keywords, limit),
+        search_targets(keywords, "", limit),
+        search_instruments(keywords, "", limit),
+        search_instrument_hosts(keywords, "", limit),
+    )
+
+    # Successful results are already JSON text, errors are plain messages
+    return orjson.dumps({
+        name: orjson.Fragment(result) if result[:1] in ("[", "{") else result
+        for name, result in zip(("investigations", "targets", "instruments", "instrument_hosts"), results)
+    }).decode()
+
+# Keys kept from the crawled product and from each associated product
+_CRAWL_KEYS = ("investigations", "observing_system_components", "targets", "title", "id")
+_CHILD_KEYS = ("title", "description")
+
+async def _fetch_one(category: str, urn_id: str) -> tuple[str, str, dict] | None:
+    """Fetch the exact version of a product associated with a crawled product, keeping only _CHILD_KEYS (None if it fails)"""
+    try:
+        content = await _fetch_product(urn_id)
+    except httpx.HTTPStatusError as e:
+        logger.warning("Failed to fetch %s: %s", urn_id, e.response.status_code)
+        return None
+    except Exception as e:
+        logger.warning("Failed to fetch %s: %s", urn_id, e)
+        return None
+    try:
+        # Only keep a subset of keys from the response, e.g., title, description, etc.
+        subset = _load_keys(content, _CHILD_KEYS)
+    except Exception as e:
+        logger.warning("Error decoding JSON for %s: %s", urn_id, e)
+        return None
+    # Keyed like the bulk search results, by the version the crawled product refers to (and that was fetched)
+    subset["id"] = urn_id
+    return category, urn_id, subset
+
+# Fields requested when looking up a crawl's associated products with one search, and the longest query
+# (in characters, after percent-encoding) sent in one request; longer lid lists are split across searches.
+# This keeps the whole URL well under the common 8 KB request-line limit
+_CHILD_SEARCH_FIELDS = ("lid", "title", "description")
+_MAX_LID_QUERY_LENGTH = 6000
+# Percent-encoded length of the " or " between two lid terms
+_OR_LENGTH = len(quote(" or "))
+
+async def _search_lids(lids: list[str]) -> dict[str, dict]:
+    """Look up products by lid with bulk `lid eq` searches, returning the found products keyed by lid"""
+    batches = [[]]
+    length = 0
+    for lid in lids:
+        term = f'lid eq "{lid}"'
+        # Measured as _build_search_url will encode it
+        term_length = len(quote(term, safe=","))
+        if batches[-1] and length + term_length > _MAX_LID_QUERY_LENGTH:
+            batches.append([])
+            length = 0
+        batches[-1].append(term)
+        length += term_length + _OR_LENGTH
+
+    # Each batch URL is long and rarely repeats, so it is built without going through build_search_url's cache
+    api_urls = [
+        _build_search_url("/products", SearchParams(
+            query="(" + " or ".join(batch) + ")",
+            fields=_CHILD_SEARCH_FIELDS,
+            limit=len(batch),
+        ))
+        for batch in batches
+    ]
+    contents = await asyncio.gather(*(_fetch(api_url, _KVP_HEADERS) for api_url in api_urls))
+    return {item["lid"]: item for content in contents for item in _load_data(content) if "lid" in item}
+
+@mcp.tool(output_schema=None)
 async def crawl_context_product(urn: str):
     """
     Crawl a single PDS Context product and return other PDS Context products it is associated with.
     Ex. Mars 2020: Perseverance Rover (Investigation) is associated with Mars (Target) and Mastcam (Instrument), so it returns Mars and Mastcam.
 
-    WARNING: Takes a long time to run and performs several sequential API calls. Use wisely.
+    WARNING: Takes a while to run and performs more than one API call. Use wisely.
     
     Args:
-        keywords: string of several keywords delimited by spaces to search PDS products (ex. 'moon jupiter titan')
-        target_type: type of PDS Context Target (eligible types are in this resource: resource://instrument_host_type)
-        limit: Maximum number of matching results returned, for pagination
+        urn: URN of the PDS Context product to crawl; any version suffix is ignored
+            (ex. urn:nasa:pds:context:investigation:mission.juno)
     
     Returns:
-        JSON string containing the search results
+        JSON string of the associated products per category (investigations, observing_system_components, targets)
     """
     
-    headers = {"Accept": "application/json"}
-    base_url = "https://pds.mcp.nasa.gov/api/search/1/products"
-
     # Clean the URN to remove version information
     clean_urn_id = clean_urn(urn)
-    api_url = base_url+f"/{clean_urn_id}"
-
-    # print(api_url)
-    response = requests.get(api_url, headers=headers)
-    response = response.json()
-    # print(json.dumps(response, indent=2))
 
-    response = {k: v for k,v in response.items() if k in ("investigations", "observing_system_components", "targets", "title", "id")}
+    try:
+        response = _load_keys(await _fetch_product(clean_urn_id), _CRAWL_KEYS)
+    except httpx.HTTPStatusError as e:
+        return f"HTTP error occurred: {e.response.status_code} - {e.response.text}"
+    except Exception as e:
+        return f"Error occurred: {str(e)}"
 
+    # Ids of the associated products per category; they are looked up by lid, so their hrefs are not needed
     urn_dict = {
-        "investigations": {},
-        "observing_system_components": {},
-        "targets": {}
+        "investigations": [],
+        "observing_system_components": [],
+        "targets": []
     }
 
     if 'investigations' in response:
         for item in response['investigations']:
-            urn_dict["investigations"][item['id']] = item['href']
+            urn_dict["investigations"].append(item['id'])
     if 'observing_system_components' in response:
         for item in response['observing_system_components']:
-            urn_dict["observing_system_components"][item['id']] = item['href']
+            urn_dict["observing_system_components"].append(item['id'])
     if 'targets' in response:
         for item in response['targets']:
-            urn_dict["targets"][item['id']] = item['href']
+            urn_dict["targets"].append(item['id'])
 
     # bulk api
 
-    # Create a results dict with the same structure as urn_dict
+    # Create a results dict with the same categories as urn_dict
     results = {
         "investigations": {},
         "observing_system_components": {},
         "targets": {}
     }
 
+    # Look up all associated products with one search rather than one request each
+    lids = {clean_urn(urn_id) for category in urn_dict for urn_id in urn_dict[category]}
+    found = None
+    if lids:
+        try:
+            found = await _search_lids(sorted(lids))
+        except Exception as e:
+            logger.warning("Bulk search for %s associated products failed: %s", len(lids), e)
+
+    missing = []
     for category in urn_dict:
-        for urn_id, href in urn_dict[category].items():
-            # print(f"Fetching: {href}")
-            resp = requests.get(href, headers={"Accept": "application/kvp+json"})
-            if resp.status_code == 200:
-                try:
-                    # Only keep a subset of keys from the response, e.g., title, description, id, etc.
-                    data = resp.json()
-                    subset_keys = ["title", "description", "id"]
-                    results[category][urn_id] = {k: v for k, v in data.items() if k in subset_keys}
-                except Exception as e:
-                    print(f"Error decoding JSON for {href}: {e}")
-            else:
-                print(f"Failed to fetch {href}: {resp.status_code}")
-
-    return json.dumps(results, indent=2)
-
-@mcp.tool()
-async def search_collections(
-    ref_lid_instrument: str | None = "",
-    ref_lid_target: str | None = "",
-    ref_lid_instrument_host: str | None  = "",
-    ref_lid_investigation: str | None = "",
-    limit: int = 10
+        for urn_id in urn_dict[category]:
+            if found is None:
+                missing.append((category, urn_id))
+                continue
+            # A lid the search did not return is not in the registry, so it is not fetched again on its own
+            item = found.get(clean_urn(urn_id))
+            if item is not None:
+                subset = {k: item[k] for k in _CHILD_KEYS if k in item}
+                subset["id"] = urn_id
+                results[category][urn_id] = subset
+
+    # Only if the bulk search failed are the products fetched individually, concurrently
+    fetched = await asyncio.gather(
+        *(_fetch_one(category, urn_id) for category, urn_id in missing),
+        return_exceptions=True,
+    )
+
+    for item in fetched:
+        # Failed fetches were already logged by _fetch_one
+        if isinstance(item, tuple):
+            category, urn_id, subset = item
+            results[category][urn_id] = subset
+
+    return orjson.dumps(results).decode()
+
+_COLLECTION_FIELDS = ("title", "lid", "ref_lid_instrument", "ref_lid_target", "ref_lid_instrument_host", "ref_lid_investigation", "ops:Label_File_Info.ops:file_ref")
+
+# Memoized like _build_context_url
+@functools.lru_cache(maxsize=256)
+def _build_collections_url(
+    ref_lid_instrument: str | None,
+    ref_lid_target: str | None,
+    ref_lid_instrument_host: str | None,
+    ref_lid_investigation: str | None,
+    limit: int
 ) -> str:
-    """
-    Search PDS data collections filtered by instrument, target, instrument host, or investigation.
-    Example: Mars Reconnaissance Orbiter HiRISE data collections targeting Mars.
-    
-    Args:
-        ref_lid_instrument (str): URN identifier for instrument (e.g. urn:nasa:pds:context:instrument:mars2020.mastcamz)
-        ref_lid_target (str): URN identifier for target (e.g. urn:nasa:pds:context:target:planet.mars)
-        ref_lid_instrument_host (str): URN identifier for instrument host (e.g. urn:nasa:pds:context:instrument_host:spacecraft.mars2020)
-        ref_lid_investigation (str): URN identifier for investigation (e.g. urn:nasa:pds:context:investigation:mission.mars2020)
-        limit (int): Max results (default 10)
-    """
-
-    base_url = "https://pds.mcp.nasa.gov/api/search/1/products"
-    headers = {"Accept": "application/kvp+json"}
+    """Build the search_collections API URL"""
+    base_url = "/products"
 
     # Base query for Product_Collection
-    q_str = r'(product_class eq "Product_Collection")'
+    q_str = '(product_class eq "Product_Collection")'
     
     # Add filters for each provided parameter
     filters = []
     
     if ref_lid_instrument:
-        clean_instrument = clean_urn(ref_lid_instrument)
+        clean_instrument = clean_urn(ref_lid_instrument).translate(_SANITIZE)
         filters.append(f'(ref_lid_instrument eq "{clean_instrument}")')
     
     if ref_lid_target:
-        clean_target = clean_urn(ref_lid_target)
+        clean_target = clean_urn(ref_lid_target).translate(_SANITIZE)
         filters.append(f'(ref_lid_target eq "{clean_target}")')
     
     if ref_lid_instrument_host:
-        clean_host = clean_urn(ref_lid_instrument_host)
+        clean_host = clean_urn(ref_lid_instrument_host).translate(_SANITIZE)
         filters.append(f'(ref_lid_instrument_host eq "{clean_host}")')
     
     if ref_lid_investigation:
-        clean_investigation = clean_urn(ref_lid_investigation)
+        clean_investigation = clean_urn(ref_lid_investigation).translate(_SANITIZE)
         filters.append(f'(ref_lid_investigation eq "{clean_investigation}")')
     
     # Combine all filters
     if filters:
         q_str = f'({q_str} and {" and ".join(filters)})'
 
-    api_url = build_search_url(base_url, SearchParams(
+    return build_search_url(base_url, SearchParams(
         query=q_str,
-        fields=["title", "lid", "ref_lid_instrument", "ref_lid_target", "ref_lid_instrument_host", "ref_lid_investigation", "ops:Label_File_Info.ops:file_ref"],
-        limit=limit,
-        sort="",
-        search_after="",
-        facet_fields="",
-        facet_limit=""
+        fields=_COLLECTION_FIELDS,
+        limit=limit
     ))
 
+@mcp.tool(output_schema=None)
+async def search_collections(
+    ref_lid_instrument: str | None = "",
+    ref_lid_target: str | None = "",
+    ref_lid_instrument_host: str | None  = "",
+    ref_lid_investigation: str | None = "",
+    limit: int = 10
+) -> str:
+    """
+    Search PDS data collections filtered by instrument, target, instrument host, or investigation.
+    Collections sit between bundles and observationals (the labels of actual data) in the PDS4 hierarchy.
+    Example: Mars Reconnaissance Orbiter HiRISE data collections targeting Mars.
+
+    Call after finding context product URNs with search_all_context (or the search_* tools when filtering by type),
+    then use get_product for details on a specific collection.
+    
+    Args:
+        ref_lid_instrument (str): URN identifier for instrument (e.g. urn:nasa:pds:context:instrument:mars2020.mastcamz)
+        ref_lid_target (str): URN identifier for target (e.g. urn:nasa:pds:context:target:planet.mars)
+        ref_lid_instrument_host (str): URN identifier for instrument host (e.g. urn:nasa:pds:context:instrument_host:spacecraft.mars2020)
+        ref_lid_investigation (str): URN identifier for investigation (e.g. urn:nasa:pds:context:investigation:mission.mars2020)
+        limit (int): Max results (default 10)
+    """
+
+    headers = _KVP_HEADERS
+
+    api_url = _build_collections_url(ref_lid_instrument, ref_lid_target, ref_lid_instrument_host, ref_lid_investigation, limit)
+
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(api_url, headers=headers)
-            response.raise_for_status()
-            data = response.json()['data']
-            for item in data:
-                if 'ops:Label_File_Info.ops:file_ref' in item:
-                    file_ref = item['ops:Label_File_Info.ops:file_ref']
-                    # Remove the filename and go one level up to the directory
-                    if file_ref:
-                        # Split by '/' and remove the last part (filename), then rejoin
-                        path_parts = file_ref.split('/')
-                        if len(path_parts) > 1:
-                            # Remove the last part (filename) to get the directory
-                            directory_path = '/'.join(path_parts[:-1])
-                            item['ops:Label_File_Info.ops:file_ref'] = directory_path
-            return json.dumps(data, indent=2)
+        data = _load_data(await _fetch(api_url, headers))
+        for item in data:
+            if 'ops:Label_File_Info.ops:file_ref' in item:
+                file_ref = item['ops:Label_File_Info.ops:file_ref']
+                # Remove the filename and go one level up to the directory
+                if file_ref:
+                    # Split by '/' and remove the last part (filename), then rejoin
+                    path_parts = file_ref.split('/')
+                    if len(path_parts) > 1:
+                        # Remove the last part (filename) to get the directory
+                        directory_path = '/'.join(path_parts[:-1])
+                        item['ops:Label_File_Info.ops:file_ref'] = directory_path
+        return orjson.dumps(data).decode()
     except httpx.HTTPStatusError as e:
         return f"HTTP error occurred: {e.response.status_code} - {e.response.text}"
     except Exception as e:
         return f"Error occurred: {str(e)}"
 
-@mcp.tool()
+@mcp.tool(output_schema=None)
 async def get_product(urn: str) -> str:
     """
     Get a single PDS product by its URN identifier.
     """
-    headers = {"Accept": "application/json"}
-    base_url = "https://pds.mcp.nasa.gov/api/search/1/products"
-    
     # Clean the URN to remove version information
     clean_urn_id = clean_urn(urn)
-    api_url = base_url+f"/{clean_urn_id}"
-    response = requests.get(api_url, headers=headers)
-    response = response.json()
-    return json.dumps(response, indent=2)
+
+    try:
+        return (await _fetch_product(clean_urn_id)).decode()
+    except httpx.HTTPStatusError as e:
+        return f"HTTP error occurred: {e.response.status_code} - {e.response.text}"
+    except Exception as e:
+        return f"Error occurred: {str(e)}"
 
 if __name__ == "__main__":
-    mcp.run()
\ No newline at end of file
+    try:
+        import uvloop
+    except ImportError:
+        # uvloop is not available on Windows
+        mcp.run()
+    else:
+        uvloop.run(mcp.run_async())
\ No newline at end of file
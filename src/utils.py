@@ -1,36 +1,70 @@
-from typing import Dict, TypedDict, Union, List
+import functools
+from dataclasses import dataclass
+from typing import Union, Tuple
+from urllib.parse import quote, urlencode
 
-class SearchParams(TypedDict, total=False):
-    """Common parameters for PDS search operations"""
-    query: Union[str, None]
-    fields: Union[List[str], None]
-    limit: int
-    sort: Union[List[str], None]
-    search_after: Union[List[str], None]
-    facet_fields: Union[List[str], None]
-    facet_limit: int
+@dataclass(frozen=True, slots=True)
+class SearchParams:
+    """Common parameters for PDS search operations (frozen so it can be used as a cache key)"""
+    query: Union[str, None] = None
+    fields: Union[Tuple[str, ...], None] = None
+    limit: Union[int, None] = None
+    sort: Union[Tuple[str, ...], None] = None
+    search_after: Union[Tuple[str, ...], None] = None
+    facet_fields: Union[Tuple[str, ...], None] = None
+    facet_limit: Union[int, None] = None
 
+    def __post_init__(self):
+        # List values are turned into tuples, so the params stay hashable for build_search_url's cache
+        for name in ("fields", "sort", "search_after", "facet_fields"):
+            value = getattr(self, name)
+            if isinstance(value, list):
+                object.__setattr__(self, name, tuple(value))
 
-def build_search_url(base_url: str, params: SearchParams) -> str:
-    """Helper function to build search URLs with common parameters"""
-    query_params = {}
+    @classmethod
+    def from_dict(cls, params: dict) -> "SearchParams":
+        """Build SearchParams from the dict form this used to be (a TypedDict)"""
+        return cls(**params)
+
+
+# (query parameter, SearchParams field, whether the value is a list joined with commas), in URL order after "q"
+_QUERY_PARAMS = (
+    ("fields", "fields", True),
+    ("limit", "limit", False),
+    ("sort", "sort", True),
+    ("search-after", "search_after", True),
+    ("facet-fields", "facet_fields", True),
+    ("facet-limit", "facet_limit", False),
+)
+
+
+def _build_search_url(base_url: str, params: SearchParams) -> str:
+    """Build a search URL with common parameters, uncached for one-off URLs that would only crowd the cache"""
+    query_params = []
     
-    if params.get("query"):
-        query_params["q"] = fr"'{params['query']}'"
-    if params.get("fields"):
-        query_params["fields"] = ",".join(params["fields"])
-    if params.get("limit") is not None:
-        query_params["limit"] = params["limit"]
-    if params.get("sort"):
-        query_params["sort"] = ",".join(params["sort"])
-    if params.get("search_after"):
-        query_params["search-after"] = ",".join(params["search_after"])
-    if params.get("facet_fields"):
-        query_params["facet-fields"] = ",".join(params["facet_fields"])
-    if params.get("facet_limit") is not None:
-        query_params["facet-limit"] = params["facet_limit"]
+    if params.query:
+        query_params.append(("q", "'" + params.query + "'"))
+    for name, field, joined in _QUERY_PARAMS:
+        value = getattr(params, field)
+        if joined:
+            if value:
+                query_params.append((name, ",".join(value)))
+        elif value is not None:
+            # Stringified here so urlencode only ever sees str values
+            query_params.append((name, str(value)))
     
-    return fr"{base_url}?{"&".join(f"{k}={v}" for k, v in query_params.items() if v is not None)}"
+    if not query_params:
+        return base_url
+    
+    # Percent-encode the values rather than relying on the HTTP client to fix up quotes, parentheses and spaces.
+    # Commas are left as-is so comma-separated lists (fields, sort, ...) stay readable in the URL
+    return "".join((base_url, "?", urlencode(query_params, quote_via=quote, safe=",")))
+
+
+@functools.lru_cache(maxsize=1024)
+def build_search_url(base_url: str, params: SearchParams) -> str:
+    """Helper function to build search URLs with common parameters, memoized per base URL and parameters"""
+    return _build_search_url(base_url, params)
 
 
 def clean_urn(urn: str) -> str:
@@ -48,5 +82,5 @@ def clean_urn(urn: str) -> str:
     if not urn:
         return urn
     
-    # Split on '::' and take only the first part (the base URN)
-    return urn.split('::')[0]
+    # Take everything before the first '::' (the base URN); partition avoids building a list like split would
+    return urn.partition('::')[0]